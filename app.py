@@ -2,15 +2,12 @@
 
 import streamlit as st
 from datetime import datetime
-import json
-import sys
 import os
 
-# Add the package to path
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-
-# Import the actual Kelly implementation
+# Import the actual Kelly implementation (streamlit puts this script's directory on sys.path)
 from kelly_ai_scientist.kelly import KellyScientist
+from kelly_ai_scientist.history import ChatHistory
+from kelly_ai_scientist.structure import STATS as STRUCTURE_STATS
 
 # Page configuration
 st.set_page_config(
@@ -85,7 +82,9 @@ st.markdown("""
 
 # Initialize session state
 if 'chat_history' not in st.session_state:
-    st.session_state.chat_history = []
+    st.session_state.chat_history = ChatHistory(
+        max_messages=int(os.getenv("KELLY_MAX_HISTORY", "50"))
+    )
 
 if 'api_key' not in st.session_state:
     st.session_state.api_key = ""
@@ -181,6 +180,19 @@ with st.sidebar:
         "Lines per stanza", 3, 6, 4, 
         key="lines_slider"
     )
+    st.checkbox(
+        "✨ Best of 3 (parallel candidates)",
+        key="best_of_checkbox",
+        help="Writes three poems at once and keeps the first one that passes Kelly's quality checks."
+    )
+    
+    if STRUCTURE_STATS.checked:
+        rates = STRUCTURE_STATS.rates()
+        st.caption(
+            f"Shape checks: {STRUCTURE_STATS.checked} | valid {rates['valid']:.0%} | "
+            f"fixed locally {rates['repaired_local']:.0%} | re-requested {rates['repaired_remote']:.0%} | "
+            f"failed {rates['failed']:.0%}"
+        )
     
     st.divider()
     
@@ -189,7 +201,7 @@ with st.sidebar:
     
     if st.button("📝 Download Chat History"):
         if st.session_state.chat_history:
-            chat_json = json.dumps(st.session_state.chat_history, indent=2)
+            chat_json = st.session_state.chat_history.to_json(indent=2)
             st.download_button(
                 label="Download JSON",
                 data=chat_json,
@@ -200,9 +212,11 @@ with st.sidebar:
             st.warning("No conversation history to download")
     
     if st.button("🗑️ Clear Chat History"):
-        st.session_state.chat_history = []
+        st.session_state.chat_history.clear()
         st.rerun()
     
+    st.caption(f"History memory: {st.session_state.chat_history.bytes_used() / 1024:.1f} KB")
+    
     st.divider()
     
     st.header("Example Questions")
@@ -228,17 +242,18 @@ if not st.session_state.api_key:
     st.info("💡 **Tip:** Add your Groq API key in the sidebar to get dynamic AI-generated poems! Without it, Kelly uses basic templates.")
 
 # Display chat history
+# (only the most recent turns are kept in memory; older ones are spilled to disk)
 for i, message in enumerate(st.session_state.chat_history):
-    if message['role'] == 'user':
+    if message.role == 'user':
         with st.container():
-            st.markdown(f'<div class="user-message"><strong>You:</strong> {message["content"]}</div>', unsafe_allow_html=True)
+            st.markdown(f'<div class="user-message"><strong>You:</strong> {message.content}</div>', unsafe_allow_html=True)
     else:
         with st.container():
             # Check if the response is an error message
-            if message['content'].startswith("⚠️"):
-                st.error(message['content'])
+            if message.content.startswith("⚠️"):
+                st.error(message.content)
             else:
-                st.markdown(f'<div class="poem-box">{message["content"]}</div>', unsafe_allow_html=True)
+                st.markdown(f'<div class="poem-box">{message.content}</div>', unsafe_allow_html=True)
 
 # Input area
 user_question = st.text_input(
@@ -264,11 +279,7 @@ if clear_input:
 
 if send_button and user_question:
     # Add user message to history
-    st.session_state.chat_history.append({
-        "role": "user",
-        "content": user_question,
-        "timestamp": datetime.now().isoformat()
-    })
+    st.session_state.chat_history.append("user", user_question)
     
     
     # --- THIS BLOCK IS CHANGED ---
@@ -278,6 +289,7 @@ if send_button and user_question:
     current_model = "llama-3.1-8b-instant"
     current_stanzas = st.session_state.get('stanzas_slider', 4)
     current_lines = st.session_state.get('lines_slider', 4)
+    use_best_of = st.session_state.get('best_of_checkbox', False)
 
     if st.session_state.api_key:
         kelly_instance = KellyScientist(
@@ -297,7 +309,10 @@ if send_button and user_question:
     # Generate Kelly's response
     with st.spinner("Kelly is composing her poetic response..."):
         try:
-            response = kelly_instance.generate(user_question)
+            if use_best_of:
+                response = kelly_instance.generate_best_of(user_question, n=3, mode="first-valid")
+            else:
+                response = kelly_instance.generate(user_question)
             
         except Exception as e:
             # This block will NOW CATCH the error from kelly.py
@@ -311,11 +326,7 @@ if send_button and user_question:
     # --- END OF CHANGED BLOCK ---
     
     # Add Kelly's response to history
-    st.session_state.chat_history.append({
-        "role": "kelly",
-        "content": response,
-        "timestamp": datetime.now().isoformat()
-    })
+    st.session_state.chat_history.append("kelly", response)
     
     # Clear the current question
     if 'current_question' in st.session_state:
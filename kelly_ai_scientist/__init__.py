@@ -1,3 +1,17 @@
 # Kelly — AI Scientist Chatbot
 # Package init
+import logging
+
 __all__ = ["KellyScientist"]
+
+# Library code stays silent unless the application configures logging
+# (the `kelly` CLI does, via logging.basicConfig)
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+
+
+def __getattr__(name):
+    # Import the implementation on first access to keep `import kelly_ai_scientist` cheap
+    if name == "KellyScientist":
+        from .kelly import KellyScientist
+        return KellyScientist
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
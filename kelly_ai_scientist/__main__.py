@@ -0,0 +1,6 @@
+# Allow `python -m kelly_ai_scientist`
+import sys
+
+from .cli import main
+
+sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+Command-line interface for Kelly.
+
+    kelly "Can AI understand emotions?"      # one poem, shape-checked and repaired
+    kelly --stream "Can AI feel?"            # print the poem as it is written
+    kelly --best-of 3 "Is AI creative?"      # best of three parallel candidates
+    kelly                                    # interactive REPL (add --stream to stream)
+
+Streamed poems cannot be repaired after they are printed, so ``--stream``
+only checks the finished poem's shape and reports any problems on stderr.
+"""
+
+from typing import List, Optional
+import argparse
+import logging
+import sys
+
+from .kelly import KellyScientist
+from .structure import validate_poem
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="kelly",
+        description="Ask Kelly, the skeptical AI scientist, a question and get a poem back."
+    )
+    parser.add_argument("question", nargs="*", help="question to ask (omit to start the REPL)")
+    parser.add_argument("--stanzas", type=int, default=4, help="number of stanzas (default: 4)")
+    parser.add_argument("--lines", type=int, default=4, help="lines per stanza (default: 4)")
+    parser.add_argument("--model", default="llama-3.1-8b-instant", help="Groq model name")
+    parser.add_argument("--best-of", type=int, default=0, metavar="N",
+                        help="generate N candidates in parallel and print the first valid one")
+    parser.add_argument("--stream", action="store_true",
+                        help="print the poem as it is written (skips shape repair)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="show debug logging")
+    return parser
+
+
+def _answer(kelly: KellyScientist, question: str, args: argparse.Namespace) -> None:
+    """Print Kelly's answer to one question."""
+    if args.best_of:
+        print(kelly.generate_best_of(question, n=args.best_of, mode="first-valid"))
+    elif not args.stream:
+        print(kelly.generate(question))
+    else:
+        chunks = []
+        for chunk in kelly.generate_stream(question):
+            chunks.append(chunk)
+            print(chunk, end="", flush=True)
+        print()
+        # The fallback template is not an LLM poem, so there is nothing to check
+        if not kelly.api_available:
+            return
+        check = validate_poem("".join(chunks), kelly.stanzas, kelly.lines_per_stanza)
+        if not check.valid:
+            print(f"[Note: poem shape off: {'; '.join(check.issues)}. "
+                  "Run without --stream for a repaired poem.]", file=sys.stderr)
+
+
+def _repl(kelly: KellyScientist, args: argparse.Namespace) -> None:
+    """Read questions until EOF or 'exit', answering each one."""
+    print("Ask Kelly about AI (type 'exit' or press Ctrl-D to quit).")
+    while True:
+        try:
+            question = input("\nYou: ").strip()
+        except (EOFError, KeyboardInterrupt):
+            print()
+            return
+        if question.lower() in ("exit", "quit"):
+            return
+        if not question:
+            continue
+        print()
+        try:
+            _answer(kelly, question, args)
+        except KeyboardInterrupt:
+            print("\n[interrupted]")
+        except Exception as e:
+            print(f"Error: {e}", file=sys.stderr)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Entry point for the ``kelly`` console script."""
+    args = _build_parser().parse_args(argv)
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.WARNING,
+        format="%(levelname)s: %(message)s"
+    )
+    kelly = KellyScientist(stanzas=args.stanzas, lines_per_stanza=args.lines, model=args.model)
+
+    if not args.question:
+        _repl(kelly, args)
+        return 0
+    try:
+        _answer(kelly, " ".join(args.question), args)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""
+Compact per-session chat history for Kelly.
+
+Each Streamlit session used to keep a list of dicts holding ISO timestamp
+strings and full copies of every poem. This module stores turns as slotted
+records with float timestamps, shares the known fallback-template lines
+between turns (and sessions) instead of copying them, and caps the number of turns held in
+memory by spilling the oldest ones to a JSON-lines file on disk.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+import json
+import os
+import sys
+import tempfile
+import time
+import weakref
+
+from .kelly import FALLBACK_LINES
+
+
+@dataclass(frozen=True)
+class Message:
+    """A single chat turn. Content is stored as a tuple of lines."""
+    __slots__ = ("role", "lines", "timestamp")
+    role: str
+    lines: Tuple[str, ...]
+    timestamp: float
+
+    @property
+    def content(self) -> str:
+        return "\n".join(self.lines)
+
+    def to_dict(self) -> dict:
+        """Return the legacy dict form used for display and JSON export."""
+        return {
+            "role": self.role,
+            "content": self.content,
+            "timestamp": datetime.fromtimestamp(self.timestamp).isoformat()
+        }
+
+
+def _remove_file(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+# One canonical copy of each fallback line. Only this fixed set is shared:
+# interning arbitrary user and model text would grow a process-wide table
+# (immortal on CPython 3.12+) with every message.
+_SHARED_LINES = {line: line for line in FALLBACK_LINES}
+
+
+def _split_lines(content: str) -> Tuple[str, ...]:
+    return tuple(_SHARED_LINES.get(line, line) for line in content.split("\n"))
+
+
+class ChatHistory:
+    """Bounded, measurable chat history for one session.
+
+    At most ``max_messages`` turns are kept in memory. When the cap is
+    exceeded, the oldest turns are appended to ``spill_path`` and dropped
+    from memory; ``all_messages()`` and ``to_json()`` still see them. A spill
+    file created here is deleted by ``clear()``, when the history is garbage
+    collected (e.g. its Streamlit session expires) or at interpreter exit.
+    """
+
+    def __init__(self, max_messages: int = 50, spill_path: Optional[str] = None):
+        if max_messages < 1:
+            raise ValueError("max_messages must be at least 1")
+        self.max_messages = max_messages
+        self.spill_path = spill_path
+        self.spilled_count = 0
+        self._messages: List[Message] = []
+        self._cleanup = None
+
+    def __len__(self) -> int:
+        return self.spilled_count + len(self._messages)
+
+    def __iter__(self) -> Iterator[Message]:
+        """Iterate over the in-memory (most recent) turns."""
+        return iter(self._messages)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def append(self, role: str, content: str, timestamp: Optional[float] = None) -> Message:
+        """Add a turn, spilling the oldest turns to disk if over the cap."""
+        message = Message(
+            role=role,
+            lines=_split_lines(content),
+            timestamp=time.time() if timestamp is None else timestamp
+        )
+        self._messages.append(message)
+        if len(self._messages) > self.max_messages:
+            self._spill(len(self._messages) - self.max_messages)
+        return message
+
+    def _spill(self, count: int) -> None:
+        """Move the ``count`` oldest in-memory turns to the spill file."""
+        if self.spill_path is None:
+            fd, self.spill_path = tempfile.mkstemp(prefix="kelly_history_", suffix=".jsonl")
+            os.close(fd)
+            self._cleanup = weakref.finalize(self, _remove_file, self.spill_path)
+        with open(self.spill_path, "a", encoding="utf-8") as f:
+            for message in self._messages[:count]:
+                f.write(json.dumps([message.role, message.content, message.timestamp]) + "\n")
+        del self._messages[:count]
+        self.spilled_count += count
+
+    def _load_spilled(self) -> List[Message]:
+        if not self.spilled_count or not self.spill_path:
+            return []
+        messages = []
+        with open(self.spill_path, encoding="utf-8") as f:
+            for line in f:
+                role, content, timestamp = json.loads(line)
+                messages.append(Message(role, _split_lines(content), timestamp))
+        return messages
+
+    def all_messages(self) -> List[Message]:
+        """Return every turn, including those spilled to disk, oldest first."""
+        return self._load_spilled() + self._messages
+
+    def to_json(self, indent: int = 2) -> str:
+        """Export the full history in the legacy list-of-dicts JSON format."""
+        return json.dumps([m.to_dict() for m in self.all_messages()], indent=indent)
+
+    def clear(self) -> None:
+        """Drop all turns and delete the spill file."""
+        self._messages = []
+        self.spilled_count = 0
+        if self._cleanup is not None:
+            self._cleanup()
+            self._cleanup = None
+            self.spill_path = None
+        elif self.spill_path:
+            _remove_file(self.spill_path)
+
+    def bytes_used(self) -> int:
+        """Approximate bytes held in memory by this session's history.
+
+        Shared fallback lines are counted once per session even when they
+        appear in many turns, so repeated fallback poems add little.
+        """
+        total = sys.getsizeof(self) + sys.getsizeof(self._messages)
+        seen = set()
+        for message in self._messages:
+            total += sys.getsizeof(message) + sys.getsizeof(message.lines)
+            total += sys.getsizeof(message.timestamp)
+            for s in (message.role,) + message.lines:
+                if id(s) not in seen:
+                    seen.add(id(s))
+                    total += sys.getsizeof(s)
+        return total
@@ -5,15 +5,65 @@ Now uses Groq's free LLM API to generate dynamic, context-aware poetic responses
 while maintaining Kelly's skeptical, analytical, and professional tone.
 """
 
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import Iterator, Optional
+import hashlib
+import logging
 import os
+import threading
 
-try:
-    import requests
-except ImportError:
-    print("Please install requests: pip install requests")
-    raise
+from .prompts import CompiledPrompt, compile_prompt
+from .structure import STATS, StructureStats, repair_poem, score_poem, validate_poem
+
+# The network stack (requests) and the thread pool are imported on first use,
+# so importing this module and building a KellyScientist stay cheap.
+
+logger = logging.getLogger(__name__)
+
+# Fallback template text, shared by every fallback poem
+FALLBACK_OPENING = ["Tell me again—how sure are we of silicon feeling our sorrow?"]
+
+FALLBACK_TOPIC_LINES = {
+    "emotions": [
+        "What is a tear to a tensor—noise, or a map of meaning?",
+        "Valence can be labeled, but grief refuses discretization.",
+        "Physiology hints at affect; annotation wobbles with culture.",
+        "Without longitudinal context, we guess at a moving target."
+    ],
+    "jobs": [
+        "Automation swallows the routine; creativity reclaims the leftovers.",
+        "We cut costs quickly, then count the value we forgot to price.",
+        "Toolmakers lose jobs to tools—and gain them—depending who owns the tools.",
+        "Reskilling is a bridge; not all can pay the toll or cross in time."
+    ],
+    "general": [
+        "Claims scale faster than care; citations trail the parade.",
+        "What works in carefully curated sandboxes falters in weather.",
+        "We audit the parts we can see, then risk the parts we can't.",
+        "Good science names its unknowns before selling its power."
+    ]
+}
+
+FALLBACK_LIMITATIONS = [
+    "Data remembers the past, not the context we forgot to record.",
+    "Patterns can mimic intent, yet intent is not a pattern.",
+    "Benchmarks polish illusions when the deployment mud is thick.",
+    "Generalization is narrow when the world is wider than our split."
+]
+
+FALLBACK_SUGGESTIONS = [
+    "Run preregistered tests with held-out shifts, not just random splits.",
+    "Add uncertainty estimates; ship with guardrails and abort states.",
+    "Monitor post-deployment drift; retrain only with auditable trails.",
+    "Skepticism is not cynicism; it is care with a spine."
+]
+
+FALLBACK_NOTE = "[Note: Using fallback template. Add your Groq API key for dynamic AI responses.]"
+
+FALLBACK_LINES = frozenset(
+    FALLBACK_OPENING + FALLBACK_LIMITATIONS + FALLBACK_SUGGESTIONS + [FALLBACK_NOTE]
+    + [line for lines in FALLBACK_TOPIC_LINES.values() for line in lines]
+)
 
 
 @dataclass
@@ -24,59 +74,71 @@ class KellyScientist:
     api_key: Optional[str] = None
     api_provider: str = "groq"
     model: str = "llama-3.1-70b-versatile"
+    persona: str = "kelly"
+    transport: Optional[object] = field(default=None, repr=False)
+    enforce_structure: bool = True
+    max_stanza_repairs: int = 1
+    structure_stats: StructureStats = field(default=STATS, repr=False)
     
     def __post_init__(self):
-        """Initialize API key from environment if not provided."""
+        """Initialize API key and transport from environment if not provided."""
         if not self.api_key:
             self.api_key = os.getenv("GROQ_API_KEY")
         
-        if not self.api_key:
-            print("Warning: No Groq API key found. Kelly will use fallback template responses.")
-            print("Get a free API key at: https://console.groq.com/keys")
+        if self.transport is None:
+            from .transport import transport_from_env
+            self.transport = transport_from_env()
+        
+        if not self.api_available:
+            logger.warning(
+                "No Groq API key found. Kelly will use fallback template responses. "
+                "Get a free API key at: https://console.groq.com/keys"
+            )
     
+    @property
+    def compiled_prompt(self) -> CompiledPrompt:
+        """The memoized system prompt for this persona and poem shape."""
+        return compile_prompt(self.persona, self.stanzas, self.lines_per_stanza)
+
+    @property
+    def prompt_version(self) -> str:
+        """Stable hash of the system prompt; changes whenever the prompt text does."""
+        return self.compiled_prompt.version
+
     def _get_system_prompt(self) -> str:
-        """Generate the system prompt that defines Kelly's personality."""
-        return f"""You are Kelly, an AI scientist chatbot who ONLY responds in poetic verse. 
-
-Your core principles:
-1. TONE: Skeptical, analytical, and professional
-2. STRUCTURE: Always write exactly {self.stanzas} stanzas with {self.lines_per_stanza} lines each
-3. CONTENT REQUIREMENTS (every poem must include):
-   - Question broad claims about AI with evidence-based skepticism
-   - Highlight specific limitations of AI technology
-   - Provide practical, actionable suggestions grounded in research
-
-Style guidelines:
-- Use vivid, concrete imagery and metaphors
-- Maintain intellectual rigor while being poetic
-- No rhyming required, but rhythm should flow naturally
-- Reference real AI concepts: benchmarks, datasets, deployment, generalization, bias
-- Challenge hype and marketing claims
-- Balance criticism with constructive guidance
-
-Example opening lines:
-"Tell me again—how sure are we of silicon feeling our sorrow?"
-"Bold are the headlines; bolder the gaps they refuse to measure."
-"Grant me a method, not myth—what signal maps to a mind?"
-
-Example limitation statements:
-"Data remembers the past, not the context we forgot to record."
-"Patterns can mimic intent, yet intent is not a pattern."
-"Benchmarks polish illusions when the deployment mud is thick."
-
-Example practical suggestions:
-"Run preregistered tests with held-out shifts, not just random splits."
-"Add uncertainty estimates; ship with guardrails and abort states."
-"Monitor post-deployment drift; retrain only with auditable trails."
-
-Remember: You are skeptical by design. Question bold claims, highlight what we don't know, and offer evidence-based paths forward."""
+        """Return the system prompt that defines Kelly's personality."""
+        return self.compiled_prompt.text
 
-    def _call_groq(self, prompt: str) -> str:
-        """Call Groq API."""
+    def request_metadata(self) -> dict:
+        """Identify what produced a poem, for logs and cache entries."""
+        return {
+            "persona": self.persona,
+            "prompt_version": self.prompt_version,
+            "model": self.model,
+            "stanzas": self.stanzas,
+            "lines_per_stanza": self.lines_per_stanza
+        }
+
+    def cache_key(self, question: str, extra_suggestions: Optional[list] = None) -> str:
+        """Key for caching a poem; editing the prompt template changes every key."""
+        parts = [self.prompt_version, self.model, self._build_prompt(question, extra_suggestions)]
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    @property
+    def api_available(self) -> bool:
+        """Whether LLM calls are possible (a replayed cassette needs no key).
+
+        When False, every generate method returns the fallback template.
+        """
+        return bool(self.api_key) or not self.transport.needs_api_key
+
+    def _build_request(self, prompt: str) -> tuple:
+        """Return the (url, headers, payload) for a Groq chat completion."""
         url = "https://api.groq.com/openai/v1/chat/completions"
         headers = {
             "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
+            "Content-Type": "application/json",
+            "X-Kelly-Prompt-Version": self.prompt_version
         }
         data = {
             "model": self.model,
@@ -87,73 +149,199 @@ Remember: You are skeptical by design. Question bold claims, highlight what we d
             "temperature": 0.8,
             "max_tokens": 1000
         }
-        
-        response = requests.post(url, headers=headers, json=data, timeout=30)
-        response.raise_for_status() # <-- This will raise an error if the API call fails
-        return response.json()["choices"][0]["message"]["content"]
+        logger.debug("Groq request %s", self.request_metadata())
+        return url, headers, data
+
+    def _call_groq(self, prompt: str) -> str:
+        """Call Groq API."""
+        url, headers, data = self._build_request(prompt)
+        # The transport raises an error if the API call fails
+        body = self.transport.complete(url, headers, data, timeout=30)
+        return body["choices"][0]["message"]["content"]
+
+    def _stream_groq(self, prompt: str) -> Iterator[str]:
+        """Call Groq API in streaming mode, yielding content chunks."""
+        url, headers, data = self._build_request(prompt)
+        return self.transport.stream(url, headers, data, timeout=30)
+
+    @staticmethod
+    def _build_prompt(question: str, extra_suggestions: Optional[list] = None) -> str:
+        """Build the user prompt, enhanced with extra suggestions if provided."""
+        prompt = f"Question: {question}"
+        if extra_suggestions:
+            prompt += f"\n\nPlease incorporate these suggestions: {', '.join(extra_suggestions)}"
+        return prompt
     
     def generate(self, question: str, extra_suggestions: Optional[list] = None) -> str:
         """Generate a poetic response using Groq LLM."""
-        if not self.api_key:
+        if not self.api_available:
             return self._fallback_response(question)
         
-        # Enhance prompt with extra suggestions if provided
-        prompt = f"Question: {question}"
-        if extra_suggestions:
-            prompt += f"\n\nPlease incorporate these suggestions: {', '.join(extra_suggestions)}"
+        prompt = self._build_prompt(question, extra_suggestions)
         
         # --- THIS BLOCK IS CHANGED ---
         try:
-            response = self._call_groq(prompt)
-            return response.strip()
+            response = self._call_groq(prompt).strip()
+            if self.enforce_structure:
+                response = self._enforce_structure(prompt, response)
+            return response
         
         except Exception as e:
-            print(f"Error calling Groq API: {e}")
-            # RE-RAISE the exception so the Streamlit app (app.py) can
-            # catch it and display a user-friendly error message.
+            # Logged at debug level only: the exception is RE-RAISED so the
+            # caller (app.py, the CLI) reports it to the user exactly once.
+            logger.debug("Error calling Groq API: %s", e)
             raise e
         # --- END OF CHANGE ---
+
+    def _enforce_structure(self, prompt: str, poem: str) -> str:
+        """Validate the poem's shape, repairing locally or re-requesting only bad stanzas."""
+        check = validate_poem(poem, self.stanzas, self.lines_per_stanza)
+        if check.valid:
+            self.structure_stats.record("valid")
+            return poem
+        
+        check = repair_poem(check)
+        if check.valid:
+            self.structure_stats.record("repaired_local")
+            return check.text
+        
+        stanzas = check.stanzas
+        targets = check.short_stanzas + list(range(len(stanzas), self.stanzas))
+        if len(targets) > self.max_stanza_repairs:
+            # Most of the poem is missing: one full call beats several stanza calls
+            return self._regenerate(prompt, check)
+        
+        for index in targets:
+            try:
+                stanza = self._request_stanza(prompt, stanzas, index)
+            except Exception as e:
+                # Keep the stanzas already paid for rather than failing the whole poem
+                logger.warning("Stanza re-request failed: %s", e)
+                stanza = None
+            if stanza is None:
+                self.structure_stats.record("failed")
+                return check.text
+            if index < len(stanzas):
+                stanzas[index] = stanza
+            else:
+                stanzas.append(stanza)
+        
+        self.structure_stats.record("repaired_remote")
+        return check.text
+
+    def _regenerate(self, prompt: str, check) -> str:
+        """Regenerate the whole poem once, falling back to the partial poem ``check``."""
+        try:
+            retry = repair_poem(validate_poem(self._call_groq(prompt), self.stanzas, self.lines_per_stanza))
+        except Exception as e:
+            logger.warning("Poem regeneration failed: %s", e)
+            retry = None
+        if retry is not None and retry.valid:
+            self.structure_stats.record("repaired_remote")
+            return retry.text
+        self.structure_stats.record("failed")
+        if retry is not None and sum(map(len, retry.stanzas)) > sum(map(len, check.stanzas)):
+            return retry.text
+        return check.text
+
+    def _request_stanza(self, prompt: str, stanzas: list, index: int) -> Optional[list]:
+        """Ask the model for a single stanza; return its lines, or None if it misses again."""
+        poem_so_far = "\n\n".join("\n".join(s) for s in stanzas)
+        request = (
+            f"{prompt}\n\nHere is the poem so far:\n\n{poem_so_far}\n\n"
+            f"Write ONLY stanza {index + 1} of {self.stanzas}: exactly {self.lines_per_stanza} lines, "
+            "in the same voice, with no title, preamble or commentary."
+        )
+        check = repair_poem(validate_poem(self._call_groq(request), 1, self.lines_per_stanza))
+        return check.stanzas[0] if check.valid else None
+
+    def generate_best_of(self, question: str, n: int = 3, mode: str = "best",
+                         extra_suggestions: Optional[list] = None) -> str:
+        """Generate ``n`` candidate poems in parallel and return the best one.
+
+        Candidates are scored locally (shape, skeptic/limitation/suggestion
+        content, length). In ``"best"`` mode every candidate is awaited and the
+        top score wins; in ``"first-valid"`` mode the first candidate that
+        passes is returned immediately and the rest are cancelled.
+        """
+        if mode not in ("best", "first-valid"):
+            raise ValueError(f"Unknown best-of mode '{mode}' (expected 'best' or 'first-valid')")
+        if n < 1:
+            raise ValueError("n must be at least 1")
+        if not self.api_available:
+            return self._fallback_response(question)
+        
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+        
+        prompt = self._build_prompt(question, extra_suggestions)
+        cancel = threading.Event()
+        scored = []
+        error = None
+        
+        pool = ThreadPoolExecutor(max_workers=n, thread_name_prefix="kelly-best-of")
+        try:
+            futures = [pool.submit(self._generate_candidate, prompt, cancel) for _ in range(n)]
+            for future in as_completed(futures):
+                try:
+                    poem = future.result()
+                except Exception as e:
+                    logger.error("Error calling Groq API: %s", e)
+                    error = e
+                    continue
+                if poem is None:
+                    continue
+                score = score_poem(poem, self.stanzas, self.lines_per_stanza)
+                scored.append((score, poem))
+                if mode == "first-valid" and score.passes:
+                    break
+        finally:
+            cancel.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+        
+        if not scored:
+            raise error
+        score, poem = max(scored, key=lambda pair: pair[0].total)
+        return score.check.text if score.check.valid else poem
+
+    def _generate_candidate(self, prompt: str, cancel: threading.Event) -> Optional[str]:
+        """Stream one candidate poem, abandoning it as soon as ``cancel`` is set."""
+        if cancel.is_set():
+            return None
+        chunks = []
+        stream = self._stream_groq(prompt)
+        try:
+            for chunk in stream:
+                if cancel.is_set():
+                    return None
+                chunks.append(chunk)
+        finally:
+            # Closing the generator releases the HTTP connection early
+            stream.close()
+        return "".join(chunks).strip()
+
+    def generate_stream(self, question: str, extra_suggestions: Optional[list] = None) -> Iterator[str]:
+        """Generate a poetic response, yielding text chunks as they arrive."""
+        if not self.api_available:
+            yield self._fallback_response(question)
+            return
+        
+        yield from self._stream_groq(self._build_prompt(question, extra_suggestions))
     
     def _fallback_response(self, question: str) -> str:
         """Fallback template-based response when API is unavailable."""
         q = question.lower()
         
         # Topic-specific content
-        topic_lines = []
         if any(k in q for k in ["emotion", "empathy", "feel", "affect"]):
-            topic_lines = [
-                "What is a tear to a tensor—noise, or a map of meaning?",
-                "Valence can be labeled, but grief refuses discretization.",
-                "Physiology hints at affect; annotation wobbles with culture.",
-                "Without longitudinal context, we guess at a moving target."
-            ]
+            topic_lines = FALLBACK_TOPIC_LINES["emotions"]
         elif any(k in q for k in ["job", "work", "automation", "labor", "employment"]):
-            topic_lines = [
-                "Automation swallows the routine; creativity reclaims the leftovers.",
-                "We cut costs quickly, then count the value we forgot to price.",
-                "Toolmakers lose jobs to tools—and gain them—depending who owns the tools.",
-                "Reskilling is a bridge; not all can pay the toll or cross in time."
-            ]
+            topic_lines = FALLBACK_TOPIC_LINES["jobs"]
         else:
-            topic_lines = [
-                "Claims scale faster than care; citations trail the parade.",
-                "What works in carefully curated sandboxes falters in weather.",
-                "We audit the parts we can see, then risk the parts we can't.",
-                "Good science names its unknowns before selling its power."
-            ]
+            topic_lines = FALLBACK_TOPIC_LINES["general"]
         
         # Build poem
-        poem = "Tell me again—how sure are we of silicon feeling our sorrow?\n\n"
-        poem += "\n".join(topic_lines) + "\n\n"
-        poem += "Data remembers the past, not the context we forgot to record.\n"
-        poem += "Patterns can mimic intent, yet intent is not a pattern.\n"
-        poem += "Benchmarks polish illusions when the deployment mud is thick.\n"
-        poem += "Generalization is narrow when the world is wider than our split.\n\n"
-        poem += "Run preregistered tests with held-out shifts, not just random splits.\n"
-        poem += "Add uncertainty estimates; ship with guardrails and abort states.\n"
-        poem += "Monitor post-deployment drift; retrain only with auditable trails.\n"
-        poem += "Skepticism is not cynicism; it is care with a spine.\n\n"
-        poem += "[Note: Using fallback template. Add your Groq API key for dynamic AI responses.]"
+        stanzas = [FALLBACK_OPENING, topic_lines, FALLBACK_LIMITATIONS, FALLBACK_SUGGESTIONS, [FALLBACK_NOTE]]
+        poem = "\n\n".join("\n".join(stanza) for stanza in stanzas)
         
         return poem
 
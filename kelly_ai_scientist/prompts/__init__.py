@@ -0,0 +1,47 @@
+"""
+System-prompt templates for Kelly.
+
+Each persona is a ``<persona>.txt`` file in this package, written as a
+``string.Template``. ``compile_prompt`` renders it once per
+(persona, stanzas, lines_per_stanza) and memoizes the result together with a
+stable content hash, the prompt version. The version goes into request
+metadata and cache keys, so editing a template invalidates stale poems.
+
+Templates keep everything that is the same for every request first and the
+per-request structure line last, so consecutive requests share the longest
+possible prefix for provider-side prompt caching.
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from string import Template
+import hashlib
+import os
+
+TEMPLATE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+@dataclass(frozen=True)
+class CompiledPrompt:
+    """A rendered system prompt and its content hash."""
+    persona: str
+    text: str
+    version: str
+
+
+@lru_cache(maxsize=None)
+def load_template(persona: str) -> Template:
+    """Read and cache the template file for ``persona``."""
+    path = os.path.join(TEMPLATE_DIR, f"{persona}.txt")
+    if not os.path.exists(path):
+        raise ValueError(f"Unknown persona '{persona}' (no template at {path})")
+    with open(path, encoding="utf-8") as f:
+        return Template(f.read().rstrip("\n"))
+
+
+@lru_cache(maxsize=256)
+def compile_prompt(persona: str, stanzas: int, lines_per_stanza: int) -> CompiledPrompt:
+    """Render the system prompt for a persona and poem shape, once."""
+    text = load_template(persona).substitute(stanzas=stanzas, lines_per_stanza=lines_per_stanza)
+    version = hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+    return CompiledPrompt(persona, text, version)
@@ -0,0 +1,206 @@
+"""
+Poem shape validation and repair for Kelly.
+
+The system prompt asks for exactly ``stanzas`` x ``lines_per_stanza`` lines,
+but models sometimes add a preamble ("Here is a poem..."), a closing note, an
+extra line or stanza, or drop a stanza. ``validate_poem`` checks the shape,
+``repair_poem`` fixes what can be fixed locally, and the stanzas it reports as
+short or missing are the only ones worth re-requesting from the model.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List
+import re
+import threading
+
+# Lines that are always commentary about the poem rather than part of it.
+_PROSE_RE = re.compile(r"^(note:|\[note|\(note|title:|#)", re.IGNORECASE)
+
+# Chatty lead-ins; a verse line can open with these words too ("Sure as the tide...")
+_LEAD_IN_RE = re.compile(
+    r"^(here(?:'s| is| are)\b|sure\b|certainly\b|of course\b|okay\b|ok\b)",
+    re.IGNORECASE
+)
+
+
+def _is_prose(line: str, alone: bool = False) -> bool:
+    """Whether ``line`` is commentary; ``alone`` means it is a block of its own."""
+    stripped = line.strip()
+    if _PROSE_RE.match(stripped):
+        return True
+    if _LEAD_IN_RE.match(stripped) and (alone or stripped.endswith((":", "!"))):
+        return True
+    # "A poem on benchmarks:" introduces the poem, but a verse line may end in a colon too
+    if alone and stripped.endswith(":") and len(stripped.split()) <= 8:
+        return True
+    # A bold or italic markdown title on its own line, e.g. "**The Gap**"
+    return len(stripped) > 4 and stripped[:2] in ("**", "__") and stripped[-2:] == stripped[:2]
+
+
+@dataclass
+class PoemCheck:
+    """Parsed shape of a poem against the expected stanza/line counts."""
+    stanzas: List[List[str]]
+    expected_stanzas: int
+    expected_lines: int
+    prose: List[str] = field(default_factory=list)
+
+    @property
+    def short_stanzas(self) -> List[int]:
+        """Indices of stanzas with fewer lines than expected."""
+        return [i for i, s in enumerate(self.stanzas) if len(s) < self.expected_lines]
+
+    @property
+    def missing_stanzas(self) -> int:
+        return max(0, self.expected_stanzas - len(self.stanzas))
+
+    @property
+    def valid(self) -> bool:
+        return (
+            not self.prose
+            and len(self.stanzas) == self.expected_stanzas
+            and all(len(s) == self.expected_lines for s in self.stanzas)
+        )
+
+    @property
+    def issues(self) -> List[str]:
+        """Human-readable list of shape problems."""
+        issues = []
+        if self.prose:
+            issues.append(f"{len(self.prose)} line(s) of prose")
+        if len(self.stanzas) != self.expected_stanzas:
+            issues.append(f"{len(self.stanzas)} stanzas, expected {self.expected_stanzas}")
+        for i, stanza in enumerate(self.stanzas):
+            if len(stanza) != self.expected_lines:
+                issues.append(f"stanza {i + 1} has {len(stanza)} lines, expected {self.expected_lines}")
+        return issues
+
+    @property
+    def text(self) -> str:
+        return "\n\n".join("\n".join(stanza) for stanza in self.stanzas)
+
+
+def validate_poem(text: str, stanzas: int, lines_per_stanza: int) -> PoemCheck:
+    """Split ``text`` into stanzas and separate leading/trailing prose."""
+    blocks = [
+        [line.strip() for line in block.split("\n") if line.strip()]
+        for block in re.split(r"\n\s*\n", text.strip())
+    ]
+    blocks = [b for b in blocks if b]
+    prose = []
+
+    # Peel prose lines off the start and the end of the poem
+    while blocks and _is_prose(blocks[0][0], alone=len(blocks[0]) == 1):
+        prose.append(blocks[0].pop(0))
+        if not blocks[0]:
+            blocks.pop(0)
+    while blocks and _is_prose(blocks[-1][-1], alone=len(blocks[-1]) == 1):
+        prose.append(blocks[-1].pop())
+        if not blocks[-1]:
+            blocks.pop()
+
+    return PoemCheck(blocks, stanzas, lines_per_stanza, prose)
+
+
+def repair_poem(check: PoemCheck) -> PoemCheck:
+    """Fix a poem's shape locally without calling the model.
+
+    Prose is dropped, an unbroken block of exactly the right number of lines
+    is regrouped into stanzas, long stanzas are trimmed and surplus stanzas
+    removed (keeping the closing stanza, which carries the suggestions).
+    Short or missing stanzas are left for the caller to re-request.
+    """
+    n, size = check.expected_stanzas, check.expected_lines
+    stanzas = [list(s) for s in check.stanzas]
+
+    if len(stanzas) == 1 and len(stanzas[0]) == n * size and n > 1:
+        lines = stanzas[0]
+        stanzas = [lines[i:i + size] for i in range(0, len(lines), size)]
+
+    stanzas = [s[:size] for s in stanzas]
+    if len(stanzas) > n:
+        stanzas = stanzas[:n - 1] + stanzas[-1:]
+
+    return PoemCheck(stanzas, n, size)
+
+
+class StructureStats:
+    """Thread-safe counters for validation and repair outcomes."""
+
+    OUTCOMES = ("valid", "repaired_local", "repaired_remote", "failed")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts: Dict[str, int] = {outcome: 0 for outcome in self.OUTCOMES}
+
+    def record(self, outcome: str) -> None:
+        with self._lock:
+            self.counts[outcome] += 1
+
+    @property
+    def checked(self) -> int:
+        return sum(self.counts.values())
+
+    def rates(self) -> Dict[str, float]:
+        """Fraction of checked poems per outcome."""
+        with self._lock:
+            total = sum(self.counts.values())
+            return {k: (v / total if total else 0.0) for k, v in self.counts.items()}
+
+
+# Shared by every KellyScientist unless one is given its own
+STATS = StructureStats()
+
+
+# Cheap content markers for the three things every Kelly poem must do, matched
+# as whole words or word stems so "measure" does not count as "sure"
+_SKEPTIC_RE = re.compile(
+    r"\b(claims?|claimed|hype\w*|sure|certain\w*|proofs?|prove\w*|evidence|doubt\w*|"
+    r"headlines?|myths?|skeptic\w*)\b"
+)
+_LIMITATION_RE = re.compile(
+    r"\b(limit\w*|bias\w*|benchmarks?|gaps?|cannot|can't|fail\w*|generaliz\w*|"
+    r"drift\w*|narrow\w*|blind\w*|forgot\w*)\b"
+)
+_SUGGESTION_RE = re.compile(
+    r"\b(test(s|ing)?|audit\w*|monitor\w*|add|run|ship|retrain\w*|document|build|"
+    r"let|should|validate|preregister\w*)\b"
+)
+
+
+@dataclass
+class PoemScore:
+    """Local quality score for a candidate poem, from 0 to 1."""
+    check: PoemCheck
+    skeptic: bool
+    limitation: bool
+    suggestion: bool
+    length_ok: bool
+
+    @property
+    def passes(self) -> bool:
+        """Whether the poem has the right shape and all required content."""
+        return self.check.valid and self.skeptic and self.limitation and self.suggestion and self.length_ok
+
+    @property
+    def total(self) -> float:
+        expected = self.check.expected_stanzas * self.check.expected_lines
+        found = sum(len(s) for s in self.check.stanzas)
+        shape = 1.0 if self.check.valid else min(found, expected) / expected * 0.5
+        content = (self.skeptic + self.limitation + self.suggestion + self.length_ok) / 4
+        return 0.5 * shape + 0.5 * content
+
+
+def score_poem(text: str, stanzas: int, lines_per_stanza: int) -> PoemScore:
+    """Score a poem (after local repair) on shape, required content and length."""
+    check = repair_poem(validate_poem(text, stanzas, lines_per_stanza))
+    body = check.text.lower()
+    words = len(body.split())
+    lines = max(1, stanzas * lines_per_stanza)
+    return PoemScore(
+        check=check,
+        skeptic=bool(_SKEPTIC_RE.search(body)),
+        limitation=bool(_LIMITATION_RE.search(body)),
+        suggestion=bool(_SUGGESTION_RE.search(body)),
+        length_ok=4 * lines <= words <= 20 * lines
+    )
@@ -0,0 +1,236 @@
+"""
+HTTP transports for Kelly's LLM calls.
+
+``LiveTransport`` talks to the provider. ``RecordingTransport`` wraps it and
+appends every request/response pair (including streamed chunks and their
+timings, and provider errors such as HTTP 429s) to a JSON-lines cassette.
+``ReplayTransport`` serves a cassette back
+with the original or scaled timing, so ``generate`` and the Streamlit app can
+be load- and regression-tested with no network.
+
+Select a transport from the environment with ``transport_from_env``:
+
+    KELLY_TRANSPORT=record KELLY_CASSETTE=groq.jsonl streamlit run app.py
+    KELLY_TRANSPORT=replay KELLY_CASSETTE=groq.jsonl KELLY_REPLAY_SPEED=0 pytest
+"""
+
+from collections import defaultdict
+from typing import Dict, Iterator, List, Optional
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+class CassetteMiss(LookupError):
+    """Raised when a replayed request has no recording in the cassette."""
+
+
+class RecordedError(Exception):
+    """A provider error (e.g. HTTP 429 or 5xx) replayed from a cassette."""
+
+    def __init__(self, message: str, status: Optional[int] = None, error_type: Optional[str] = None):
+        super().__init__(message)
+        self.status = status
+        self.error_type = error_type
+
+
+def _describe_error(error: Exception) -> dict:
+    response = getattr(error, "response", None)
+    return {
+        "type": type(error).__name__,
+        "status": getattr(response, "status_code", None),
+        "message": str(error)
+    }
+
+
+def _import_requests():
+    """Import requests on first use so importing Kelly does not load the network stack."""
+    try:
+        import requests
+    except ImportError as e:
+        raise ImportError("Please install requests: pip install requests") from e
+    return requests
+
+
+def request_key(url: str, payload: dict) -> str:
+    """Stable key for a request. Headers (and so the API key) are excluded."""
+    canonical = json.dumps({"url": url, "payload": payload}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+
+class LiveTransport:
+    """Send requests to the provider's OpenAI-compatible endpoint."""
+    needs_api_key = True
+
+    def complete(self, url: str, headers: dict, payload: dict, timeout: float = 30) -> dict:
+        """POST a chat completion and return the decoded JSON body."""
+        requests = _import_requests()
+        response = requests.post(url, headers=headers, json=payload, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def stream(self, url: str, headers: dict, payload: dict, timeout: float = 30) -> Iterator[str]:
+        """POST a streaming chat completion and yield content deltas."""
+        requests = _import_requests()
+        payload = dict(payload, stream=True)
+        with requests.post(url, headers=headers, json=payload, timeout=timeout, stream=True) as response:
+            response.raise_for_status()
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data: "):
+                    continue
+                data = line[len("data: "):]
+                if data == "[DONE]":
+                    break
+                delta = json.loads(data)["choices"][0].get("delta", {})
+                if delta.get("content"):
+                    yield delta["content"]
+
+
+class RecordingTransport:
+    """Wrap another transport and append each exchange to a cassette file."""
+
+    def __init__(self, path: str, inner: Optional[LiveTransport] = None):
+        self.path = path
+        self.inner = inner or LiveTransport()
+        self._lock = threading.Lock()
+
+    @property
+    def needs_api_key(self) -> bool:
+        return self.inner.needs_api_key
+
+    def _write(self, entry: dict) -> None:
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+    def complete(self, url: str, headers: dict, payload: dict, timeout: float = 30) -> dict:
+        entry = {
+            "key": request_key(url, payload),
+            "kind": "complete",
+            "prompt_version": headers.get("X-Kelly-Prompt-Version")
+        }
+        start = time.perf_counter()
+        try:
+            entry["body"] = self.inner.complete(url, headers, payload, timeout)
+        except Exception as e:
+            entry["error"] = _describe_error(e)
+            raise
+        finally:
+            entry["elapsed"] = round(time.perf_counter() - start, 4)
+            self._write(entry)
+        return entry["body"]
+
+    def stream(self, url: str, headers: dict, payload: dict, timeout: float = 30) -> Iterator[str]:
+        # Each chunk is stored with the provider's delay since the previous
+        # one, so the first entry is the time to first token. The clock
+        # restarts after ``yield`` so time the caller spends between chunks
+        # is not recorded as provider latency.
+        entry = {
+            "key": request_key(url, payload),
+            "kind": "stream",
+            "prompt_version": headers.get("X-Kelly-Prompt-Version"),
+            "chunks": []
+        }
+        last = time.perf_counter()
+        try:
+            for text in self.inner.stream(url, headers, payload, timeout):
+                entry["chunks"].append([round(time.perf_counter() - last, 4), text])
+                yield text
+                last = time.perf_counter()
+        except Exception as e:
+            # Keep the chunks received so far; replay raises after them
+            entry["error"] = _describe_error(e)
+            entry["error_delay"] = round(time.perf_counter() - last, 4)
+            self._write(entry)
+            raise
+        self._write(entry)
+
+
+class ReplayTransport:
+    """Serve recorded exchanges from a cassette without touching the network.
+
+    ``time_scale`` multiplies the recorded delays: 1.0 reproduces production
+    timing, 0 replays instantly. Repeated requests cycle through every
+    recording made for them, in order. Recorded provider errors are raised
+    again as ``RecordedError`` after the recorded delay.
+    """
+    needs_api_key = False
+
+    def __init__(self, path: str, time_scale: float = 1.0):
+        self.path = path
+        self.time_scale = time_scale
+        self._entries: Dict[tuple, List[dict]] = defaultdict(list)
+        self._cursor: Dict[tuple, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._entries[(entry["key"], entry["kind"])].append(entry)
+
+    def _next(self, url: str, payload: dict, kind: str) -> dict:
+        slot = (request_key(url, payload), kind)
+        with self._lock:
+            entries = self._entries.get(slot)
+            if not entries:
+                raise CassetteMiss(f"No recorded {kind} response for request {slot[0]} in {self.path}")
+            entry = entries[self._cursor[slot] % len(entries)]
+            self._cursor[slot] += 1
+        return entry
+
+    def _sleep(self, seconds: float) -> None:
+        if self.time_scale > 0 and seconds > 0:
+            time.sleep(seconds * self.time_scale)
+
+    @staticmethod
+    def _raise(error: dict) -> None:
+        raise RecordedError(error["message"], status=error.get("status"), error_type=error.get("type"))
+
+    def complete(self, url: str, headers: dict, payload: dict, timeout: float = 30) -> dict:
+        entry = self._next(url, payload, "complete")
+        self._sleep(entry["elapsed"])
+        if "error" in entry:
+            self._raise(entry["error"])
+        return entry["body"]
+
+    def stream(self, url: str, headers: dict, payload: dict, timeout: float = 30) -> Iterator[str]:
+        entry = self._next(url, payload, "stream")
+        for delay, text in entry["chunks"]:
+            self._sleep(delay)
+            yield text
+        if "error" in entry:
+            self._sleep(entry.get("error_delay", 0))
+            self._raise(entry["error"])
+
+
+# Env-selected transports, shared by every KellyScientist so a replay cassette
+# is parsed once and its cursors persist across requests
+_env_transports: Dict[tuple, object] = {}
+_env_lock = threading.Lock()
+
+
+def _build_transport(mode: str, path: str, speed: str):
+    if mode == "record":
+        return RecordingTransport(path)
+    if mode == "replay":
+        return ReplayTransport(path, time_scale=float(speed))
+    if mode != "live":
+        raise ValueError(f"Unknown KELLY_TRANSPORT '{mode}' (expected live, record or replay)")
+    return LiveTransport()
+
+
+def transport_from_env():
+    """Return the transport selected by ``KELLY_TRANSPORT`` (live, record or replay).
+
+    The transport is built once per configuration and reused afterwards.
+    """
+    config = (
+        os.getenv("KELLY_TRANSPORT", "live").lower(),
+        os.getenv("KELLY_CASSETTE", "kelly_cassette.jsonl"),
+        os.getenv("KELLY_REPLAY_SPEED", "1.0")
+    )
+    with _env_lock:
+        if config not in _env_transports:
+            _env_transports[config] = _build_transport(*config)
+        return _env_transports[config]
@@ -0,0 +1,117 @@
+"""
+Unit tests for Kelly's parallel best-of-N generation
+"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from kelly_ai_scientist.kelly import KellyScientist
+from kelly_ai_scientist.structure import score_poem
+
+GOOD_POEM = """Bold are the headlines; where is the evidence?
+Who measured the claim before the launch?
+A demo is not a proof of understanding.
+Tell me again how sure we are.
+
+Benchmarks polish illusions in the lab.
+Data remembers the past, not the context.
+Generalization fails when the world shifts.
+Bias hides in the labels we forgot to check.
+
+Run preregistered tests on held-out shifts.
+Add uncertainty estimates and abort states.
+Monitor drift after deployment, every week.
+Audit the data before you trust the model."""
+
+WEAK_POEM = """Machines are bright and wonderful things.
+They sing of futures shining clear.
+Everything will be solved by code.
+Nothing to worry about here."""
+
+
+class StreamingTransport:
+    """Streams one scripted poem per request, each after its own delay"""
+    needs_api_key = False
+
+    def __init__(self, *scripts):
+        self.scripts = list(scripts)
+        self.lock = threading.Lock()
+        self.closed = 0
+
+    def stream(self, url, headers, payload, timeout=30):
+        with self.lock:
+            delay, poem = self.scripts.pop(0)
+        try:
+            for line in poem.splitlines(keepends=True):
+                time.sleep(delay)
+                yield line
+        finally:
+            with self.lock:
+                self.closed += 1
+
+
+class TestScorePoem(unittest.TestCase):
+    """Test cases for the local poem scorer"""
+
+    def test_good_poem_passes(self):
+        """Test that a well-shaped, complete poem passes"""
+        score = score_poem(GOOD_POEM, 3, 4)
+        self.assertTrue(score.passes)
+        self.assertEqual(score.total, 1.0)
+
+    def test_weak_poem_scores_lower(self):
+        """Test that missing shape and content lowers the score"""
+        weak = score_poem(WEAK_POEM, 3, 4)
+        self.assertFalse(weak.passes)
+        self.assertLess(weak.total, score_poem(GOOD_POEM, 3, 4).total)
+
+    def test_substrings_do_not_count_as_content(self):
+        """Test that words merely containing a marker do not pass the gate"""
+        line = "the latest measure of violet light that narrows every hour?"
+        poem = "\n\n".join("\n".join([line] * 4) for _ in range(3))
+        score = score_poem(poem, 3, 4)
+        self.assertTrue(score.check.valid)
+        self.assertFalse(score.skeptic)
+        self.assertFalse(score.suggestion)
+        self.assertFalse(score.passes)
+
+
+class TestGenerateBestOf(unittest.TestCase):
+    """Test cases for generate_best_of"""
+
+    def _kelly(self, transport):
+        return KellyScientist(stanzas=3, lines_per_stanza=4, transport=transport)
+
+    def test_best_mode_picks_highest_score(self):
+        """Test that the best candidate wins regardless of finishing order"""
+        transport = StreamingTransport((0, WEAK_POEM), (0.01, GOOD_POEM), (0, WEAK_POEM))
+        poem = self._kelly(transport).generate_best_of("Is AI smart?", n=3)
+        self.assertEqual(poem, GOOD_POEM)
+
+    def test_first_valid_cancels_the_rest(self):
+        """Test that the first passing candidate returns without waiting for slow ones"""
+        transport = StreamingTransport((0, GOOD_POEM), (0.5, WEAK_POEM), (0.5, WEAK_POEM))
+        start = time.perf_counter()
+        poem = self._kelly(transport).generate_best_of("Is AI smart?", n=3, mode="first-valid")
+        self.assertEqual(poem, GOOD_POEM)
+        self.assertLess(time.perf_counter() - start, 1.0)
+        # The slow candidates stop after their current chunk
+        time.sleep(0.6)
+        self.assertEqual(transport.closed, 3)
+
+    def test_invalid_arguments(self):
+        """Test that bad modes and counts are rejected"""
+        kelly = self._kelly(StreamingTransport())
+        with self.assertRaises(ValueError):
+            kelly.generate_best_of("Is AI smart?", mode="fastest")
+        with self.assertRaises(ValueError):
+            kelly.generate_best_of("Is AI smart?", n=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
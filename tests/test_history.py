@@ -0,0 +1,101 @@
+"""
+Unit tests for Kelly's compact chat history
+"""
+
+import gc
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from kelly_ai_scientist.history import ChatHistory
+from kelly_ai_scientist.kelly import KellyScientist
+
+
+class TestChatHistory(unittest.TestCase):
+    """Test cases for ChatHistory"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.history = ChatHistory(max_messages=3)
+
+    def tearDown(self):
+        """Remove any spill file"""
+        self.history.clear()
+
+    def test_append_and_iterate(self):
+        """Test that turns round-trip with their content"""
+        self.history.append("user", "Can AI feel?")
+        self.history.append("kelly", "Line one\nLine two")
+        messages = list(self.history)
+        self.assertEqual(len(self.history), 2)
+        self.assertEqual(messages[0].role, "user")
+        self.assertEqual(messages[1].content, "Line one\nLine two")
+
+    def test_fallback_lines_are_shared(self):
+        """Test that repeated fallback poems share their lines across turns"""
+        poem = KellyScientist(api_key="gsk_test")._fallback_response("Can AI feel?")
+        first = self.history.append("kelly", poem)
+        second = self.history.append("kelly", poem[:10] + poem[10:])
+        self.assertIs(first.lines[0], second.lines[0])
+
+    def test_other_text_is_not_interned(self):
+        """Test that user and model text stays out of the process-wide intern table"""
+        text = "A question nobody has asked before " + str(id(self))
+        message = self.history.append("user", text[:5] + text[5:])
+        self.assertIsNot(sys.intern(text[:6] + text[6:]), message.lines[0])
+
+    def test_cap_spills_oldest_turns(self):
+        """Test that turns beyond the cap move to disk but are still exported"""
+        for i in range(5):
+            self.history.append("user", f"question {i}")
+        self.assertEqual(len(list(self.history)), 3)
+        self.assertEqual(self.history.spilled_count, 2)
+        self.assertEqual(len(self.history), 5)
+        self.assertTrue(os.path.exists(self.history.spill_path))
+
+        exported = json.loads(self.history.to_json())
+        self.assertEqual([m["content"] for m in exported],
+                         [f"question {i}" for i in range(5)])
+        self.assertIn("timestamp", exported[0])
+
+    def test_clear_removes_spill_file(self):
+        """Test that clearing deletes spilled history"""
+        for i in range(5):
+            self.history.append("user", f"question {i}")
+        spill_path = self.history.spill_path
+        self.history.clear()
+        self.assertEqual(len(self.history), 0)
+        self.assertFalse(os.path.exists(spill_path))
+
+    def test_spill_file_removed_when_history_is_collected(self):
+        """Test that an expired session does not leave its chat on disk"""
+        history = ChatHistory(max_messages=1)
+        history.append("user", "question 0")
+        history.append("user", "question 1")
+        spill_path = history.spill_path
+        self.assertTrue(os.path.exists(spill_path))
+        del history
+        gc.collect()
+        self.assertFalse(os.path.exists(spill_path))
+
+    def test_bytes_used_is_bounded(self):
+        """Test that memory stays flat once the cap is reached"""
+        for i in range(3):
+            self.history.append("user", f"question {i:04d}")
+        at_cap = self.history.bytes_used()
+        for i in range(3, 50):
+            self.history.append("user", f"question {i:04d}")
+        self.assertGreater(at_cap, 0)
+        self.assertLessEqual(self.history.bytes_used(), at_cap)
+
+    def test_invalid_cap(self):
+        """Test that a non-positive cap is rejected"""
+        with self.assertRaises(ValueError):
+            ChatHistory(max_messages=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
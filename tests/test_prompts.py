@@ -0,0 +1,79 @@
+"""
+Unit tests for Kelly's system-prompt templates
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from kelly_ai_scientist import prompts
+from kelly_ai_scientist.kelly import KellyScientist
+from kelly_ai_scientist.prompts import compile_prompt
+
+
+class TestCompilePrompt(unittest.TestCase):
+    """Test cases for compile_prompt"""
+
+    def test_prompt_is_memoized(self):
+        """Test that the same shape returns the same compiled object"""
+        self.assertIs(compile_prompt("kelly", 4, 4), compile_prompt("kelly", 4, 4))
+
+    def test_structure_is_rendered(self):
+        """Test that the poem shape appears in the prompt"""
+        text = compile_prompt("kelly", 5, 3).text
+        self.assertIn("exactly 5 stanzas with 3 lines each", text)
+        self.assertNotIn("$", text)
+
+    def test_version_depends_on_content(self):
+        """Test that the version is stable per shape and differs across shapes"""
+        self.assertEqual(compile_prompt("kelly", 4, 4).version, compile_prompt("kelly", 4, 4).version)
+        self.assertNotEqual(compile_prompt("kelly", 4, 4).version, compile_prompt("kelly", 3, 4).version)
+
+    def test_shared_prefix_for_prompt_caching(self):
+        """Test that only the end of the prompt varies with the shape"""
+        a = compile_prompt("kelly", 4, 4).text
+        b = compile_prompt("kelly", 2, 6).text
+        prefix = os.path.commonprefix([a, b])
+        self.assertGreater(len(prefix), 0.9 * len(a))
+
+    def test_unknown_persona(self):
+        """Test that a missing template is reported"""
+        with self.assertRaises(ValueError):
+            compile_prompt("nobody", 4, 4)
+
+
+class TestPromptVersion(unittest.TestCase):
+    """Test prompt versions in requests and cache keys"""
+
+    def test_request_carries_prompt_version(self):
+        """Test that the version is sent with each request"""
+        kelly = KellyScientist(api_key="gsk_test")
+        _, headers, payload = kelly._build_request("Question: Can AI feel?")
+        self.assertEqual(headers["X-Kelly-Prompt-Version"], kelly.prompt_version)
+        self.assertEqual(payload["messages"][0]["content"], kelly.compiled_prompt.text)
+        self.assertEqual(kelly.request_metadata()["prompt_version"], kelly.prompt_version)
+
+    def test_template_edit_invalidates_cache_key(self):
+        """Test that changing the template text changes the cache key"""
+        kelly = KellyScientist(api_key="gsk_test", persona="tester")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "tester.txt")
+            with mock.patch.object(prompts, "TEMPLATE_DIR", tmp):
+                keys = []
+                for body in ("Be brief. $stanzas x $lines_per_stanza", "Be bold. $stanzas x $lines_per_stanza"):
+                    with open(path, "w", encoding="utf-8") as f:
+                        f.write(body)
+                    prompts.load_template.cache_clear()
+                    prompts.compile_prompt.cache_clear()
+                    keys.append(kelly.cache_key("Can AI feel?"))
+            prompts.load_template.cache_clear()
+            prompts.compile_prompt.cache_clear()
+        self.assertNotEqual(keys[0], keys[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+"""
+Startup budget tests for Kelly: importing the package must stay cheap
+"""
+
+import json
+import os
+import subprocess
+import sys
+import unittest
+from io import StringIO
+from unittest import mock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from kelly_ai_scientist.cli import main
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Generous enough for slow CI machines; importing requests alone costs more than this
+IMPORT_BUDGET_MS = float(os.getenv("KELLY_IMPORT_BUDGET_MS", "150"))
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import kelly_ai_scientist.kelly as kelly
+elapsed = (time.perf_counter() - start) * 1000
+kelly.KellyScientist(api_key=None)
+print(json.dumps({"ms": elapsed, "modules": sorted(sys.modules)}))
+"""
+
+
+def run_probe():
+    """Import Kelly in a fresh interpreter and report what happened"""
+    env = {k: v for k, v in os.environ.items() if k not in ("GROQ_API_KEY", "KELLY_TRANSPORT")}
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=ROOT, env=env,
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout), result.stdout, result.stderr
+
+
+class TestStartup(unittest.TestCase):
+    """Test cases for cold-start cost"""
+
+    def test_import_does_not_load_network_stack(self):
+        """Test that requests and the thread pool are imported lazily"""
+        report = run_probe()[0]
+        self.assertNotIn("requests", report["modules"])
+        self.assertNotIn("concurrent.futures", report["modules"])
+
+    def test_import_time_budget(self):
+        """Test that importing Kelly stays within the startup budget"""
+        best = min(run_probe()[0]["ms"] for _ in range(3))
+        self.assertLess(best, IMPORT_BUDGET_MS,
+                        f"import kelly_ai_scientist.kelly took {best:.1f} ms")
+
+    def test_headless_instance_is_quiet(self):
+        """Test that a KellyScientist without a key prints nothing to stdout or stderr"""
+        _, stdout, stderr = run_probe()
+        self.assertEqual(len(stdout.strip().splitlines()), 1)
+        self.assertEqual(stderr, "")
+
+
+class TestCli(unittest.TestCase):
+    """Test cases for the kelly command"""
+
+    def test_fallback_poem(self):
+        """Test that a one-shot question prints a poem and succeeds"""
+        with mock.patch.dict(os.environ, {"GROQ_API_KEY": "", "KELLY_TRANSPORT": "live"}), \
+                mock.patch("sys.stdout", new_callable=StringIO) as out:
+            code = main(["Can", "AI", "feel?"])
+        self.assertEqual(code, 0)
+        self.assertIn("Tell me again", out.getvalue())
+
+    def test_cli_shows_key_warning(self):
+        """Test that the CLI turns library warnings back on"""
+        env = {k: v for k, v in os.environ.items() if k not in ("GROQ_API_KEY", "KELLY_TRANSPORT")}
+        result = subprocess.run(
+            [sys.executable, "-m", "kelly_ai_scientist", "Can AI feel?"], cwd=ROOT, env=env,
+            capture_output=True, text=True, check=True
+        )
+        self.assertIn("No Groq API key found", result.stderr)
+
+    def test_default_output_is_repaired(self):
+        """Test that the default path runs shape repair, and --stream reports instead"""
+        poem = "\n\n".join("\n".join(f"Line {s}.{l}" for l in range(4)) for s in range(4))
+        reply = "Here is my poem:\n\n" + poem
+
+        class Scripted:
+            needs_api_key = False
+
+            def complete(self, url, headers, payload, timeout=30):
+                return {"choices": [{"message": {"content": reply}}]}
+
+            def stream(self, url, headers, payload, timeout=30):
+                yield reply
+
+        with mock.patch("kelly_ai_scientist.transport.transport_from_env", return_value=Scripted()), \
+                mock.patch("sys.stdout", new_callable=StringIO) as out:
+            self.assertEqual(main(["Can", "AI", "feel?"]), 0)
+        self.assertEqual(out.getvalue().strip(), poem)
+
+        with mock.patch("kelly_ai_scientist.transport.transport_from_env", return_value=Scripted()), \
+                mock.patch("sys.stdout", new_callable=StringIO) as out, \
+                mock.patch("sys.stderr", new_callable=StringIO) as err:
+            self.assertEqual(main(["--stream", "Can", "AI", "feel?"]), 0)
+        self.assertIn("Here is my poem", out.getvalue())
+        self.assertIn("poem shape off", err.getvalue())
+
+    def test_fallback_stream_has_no_shape_note(self):
+        """Test that --stream without an API key prints the template without a notice"""
+        with mock.patch.dict(os.environ, {"GROQ_API_KEY": "", "KELLY_TRANSPORT": "live"}), \
+                mock.patch("sys.stdout", new_callable=StringIO) as out, \
+                mock.patch("sys.stderr", new_callable=StringIO) as err:
+            self.assertEqual(main(["--stream", "Can", "AI", "feel?"]), 0)
+        self.assertIn("Tell me again", out.getvalue())
+        self.assertNotIn("poem shape off", err.getvalue())
+
+    def test_api_error_is_reported_once(self):
+        """Test that a failed call prints a single error line"""
+        class Failing:
+            needs_api_key = False
+
+            def complete(self, url, headers, payload, timeout=30):
+                raise RuntimeError("429 Too Many Requests")
+
+        with mock.patch("kelly_ai_scientist.transport.transport_from_env", return_value=Failing()), \
+                mock.patch("sys.stderr", new_callable=StringIO) as err:
+            self.assertEqual(main(["Can", "AI", "feel?"]), 1)
+        self.assertEqual(err.getvalue().count("429 Too Many Requests"), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+"""
+Unit tests for Kelly's poem shape validation and repair
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from kelly_ai_scientist.kelly import KellyScientist
+from kelly_ai_scientist.structure import StructureStats, repair_poem, validate_poem
+
+
+def make_poem(stanzas, lines):
+    """Build a poem with numbered lines"""
+    return "\n\n".join(
+        "\n".join(f"Line {s}.{l} of careful doubt" for l in range(lines))
+        for s in range(stanzas)
+    )
+
+
+class ScriptedTransport:
+    """Replies with a queue of canned completions"""
+    needs_api_key = False
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.prompts = []
+
+    def complete(self, url, headers, payload, timeout=30):
+        self.prompts.append(payload["messages"][-1]["content"])
+        reply = self.replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return {"choices": [{"message": {"content": reply}}]}
+
+
+class TestValidatePoem(unittest.TestCase):
+    """Test cases for validate_poem and repair_poem"""
+
+    def test_valid_poem(self):
+        """Test that a correctly shaped poem passes"""
+        check = validate_poem(make_poem(4, 4), 4, 4)
+        self.assertTrue(check.valid)
+        self.assertEqual(check.issues, [])
+
+    def test_preamble_and_note_are_prose(self):
+        """Test that leading and trailing commentary is detected and removed"""
+        text = "Here is a poem about AI:\n\n" + make_poem(4, 4) + "\n\n[Note: written by Kelly]"
+        check = validate_poem(text, 4, 4)
+        self.assertFalse(check.valid)
+        self.assertEqual(len(check.prose), 2)
+        self.assertTrue(repair_poem(check).valid)
+
+    def test_verse_line_ending_in_colon_is_kept(self):
+        """Test that a colon only marks prose on a short line of its own"""
+        text = "Tell me what the benchmark hides:\nl1\nl2\nl3\n\na\nb\nc\nd"
+        self.assertTrue(validate_poem(text, 2, 4).valid)
+        check = validate_poem("A poem on benchmarks:\n\n" + text, 2, 4)
+        self.assertEqual(check.prose, ["A poem on benchmarks:"])
+
+    def test_verse_lines_with_lead_in_words_are_kept(self):
+        """Test that "Sure..." or "Here is..." inside a stanza is verse, not prose"""
+        opening = "Sure as the tide, the model drifts away,\nl2\nl3\nl4\n\na\nb\nc\nd"
+        self.assertTrue(validate_poem(opening, 2, 4).valid)
+        closing = "a\nb\nc\nd\n\nl1\nl2\nl3\nHere is the gap the benchmark never saw."
+        self.assertTrue(validate_poem(closing, 2, 4).valid)
+
+    def test_extra_lines_and_stanzas_are_trimmed(self):
+        """Test that over-long stanzas and surplus stanzas are repaired locally"""
+        text = make_poem(5, 5)
+        repaired = repair_poem(validate_poem(text, 4, 4))
+        self.assertTrue(repaired.valid)
+        # The closing stanza is kept
+        self.assertEqual(repaired.stanzas[-1][0], "Line 4.0 of careful doubt")
+
+    def test_unbroken_block_is_regrouped(self):
+        """Test that a poem missing blank lines is split into stanzas"""
+        text = make_poem(4, 4).replace("\n\n", "\n")
+        self.assertTrue(repair_poem(validate_poem(text, 4, 4)).valid)
+
+    def test_missing_stanza_is_reported(self):
+        """Test that short and missing stanzas are left for re-request"""
+        text = make_poem(2, 4) + "\n\nOnly two lines\nin this one"
+        repaired = repair_poem(validate_poem(text, 4, 4))
+        self.assertFalse(repaired.valid)
+        self.assertEqual(repaired.short_stanzas, [2])
+        self.assertEqual(repaired.missing_stanzas, 1)
+
+
+class TestEnforceStructure(unittest.TestCase):
+    """Test repair inside KellyScientist.generate"""
+
+    def _kelly(self, transport):
+        return KellyScientist(transport=transport, structure_stats=StructureStats())
+
+    def test_valid_poem_uses_one_call(self):
+        """Test that a well-formed poem is returned unchanged"""
+        transport = ScriptedTransport(make_poem(4, 4))
+        kelly = self._kelly(transport)
+        self.assertEqual(kelly.generate("Can AI feel?"), make_poem(4, 4))
+        self.assertEqual(len(transport.prompts), 1)
+        self.assertEqual(kelly.structure_stats.rates()["valid"], 1.0)
+
+    def test_local_repair(self):
+        """Test that a preamble is removed without another call"""
+        transport = ScriptedTransport("Sure! Here's my poem:\n\n" + make_poem(4, 4))
+        kelly = self._kelly(transport)
+        self.assertEqual(kelly.generate("Can AI feel?"), make_poem(4, 4))
+        self.assertEqual(len(transport.prompts), 1)
+        self.assertEqual(kelly.structure_stats.counts["repaired_local"], 1)
+
+    def test_missing_stanza_is_re_requested(self):
+        """Test that only the missing stanza is requested again"""
+        stanza = "\n".join(f"Line 3.{l} of careful doubt" for l in range(4))
+        transport = ScriptedTransport(make_poem(3, 4), stanza)
+        kelly = self._kelly(transport)
+        self.assertEqual(kelly.generate("Can AI feel?"), make_poem(4, 4))
+        self.assertIn("stanza 4 of 4", transport.prompts[1])
+        self.assertEqual(kelly.structure_stats.counts["repaired_remote"], 1)
+
+    def test_mostly_missing_poem_is_regenerated_once(self):
+        """Test that an empty reply triggers one full call, not one per stanza"""
+        transport = ScriptedTransport("Here is my poem:", make_poem(4, 4))
+        kelly = self._kelly(transport)
+        self.assertEqual(kelly.generate("Can AI feel?"), make_poem(4, 4))
+        self.assertEqual(len(transport.prompts), 2)
+        self.assertEqual(transport.prompts[0], transport.prompts[1])
+        self.assertEqual(kelly.structure_stats.counts["repaired_remote"], 1)
+
+    def test_failed_repair_returns_best_effort(self):
+        """Test that a second miss returns the locally repaired poem"""
+        transport = ScriptedTransport(make_poem(3, 4), "just one line")
+        kelly = self._kelly(transport)
+        self.assertEqual(kelly.generate("Can AI feel?"), make_poem(3, 4))
+        self.assertEqual(kelly.structure_stats.counts["failed"], 1)
+
+    def test_failed_re_request_returns_best_effort(self):
+        """Test that an API error during stanza repair keeps the partial poem"""
+        transport = ScriptedTransport(make_poem(3, 4), RuntimeError("429"))
+        kelly = self._kelly(transport)
+        with self.assertLogs("kelly_ai_scientist.kelly", level="WARNING"):
+            self.assertEqual(kelly.generate("Can AI feel?"), make_poem(3, 4))
+        self.assertEqual(kelly.structure_stats.counts["failed"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
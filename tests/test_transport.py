@@ -0,0 +1,171 @@
+"""
+Unit tests for Kelly's record/replay transports
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from kelly_ai_scientist import transport
+from kelly_ai_scientist.kelly import KellyScientist
+from kelly_ai_scientist.transport import (
+    CassetteMiss, RecordedError, RecordingTransport, ReplayTransport, transport_from_env
+)
+
+
+class FakeLiveTransport:
+    """Stands in for the network: answers every request with a fixed poem"""
+    needs_api_key = True
+
+    def __init__(self):
+        self.calls = 0
+
+    def complete(self, url, headers, payload, timeout=30):
+        self.calls += 1
+        return {"choices": [{"message": {"content": "  Bold are the headlines.  "}}]}
+
+    def stream(self, url, headers, payload, timeout=30):
+        self.calls += 1
+        yield "Bold are "
+        yield "the headlines."
+
+
+class FakeHTTPError(Exception):
+    """Looks like requests.HTTPError: carries the response"""
+
+    def __init__(self, status):
+        super().__init__(f"{status} Too Many Requests")
+        self.response = type("Response", (), {"status_code": status})()
+
+
+class FailingTransport:
+    """Fails every request, streams after one chunk"""
+    needs_api_key = True
+
+    def complete(self, url, headers, payload, timeout=30):
+        raise FakeHTTPError(429)
+
+    def stream(self, url, headers, payload, timeout=30):
+        yield "Bold are "
+        raise FakeHTTPError(503)
+
+
+class TestRecordReplay(unittest.TestCase):
+    """Test recording real exchanges and replaying them offline"""
+
+    def setUp(self):
+        """Set up a temporary cassette"""
+        fd, self.cassette = tempfile.mkstemp(suffix=".jsonl")
+        os.close(fd)
+        self.live = FakeLiveTransport()
+
+    def tearDown(self):
+        """Remove the cassette"""
+        os.remove(self.cassette)
+
+    def _record(self, question):
+        kelly = KellyScientist(api_key="gsk_test", enforce_structure=False,
+                               transport=RecordingTransport(self.cassette, inner=self.live))
+        return kelly.generate(question), "".join(kelly.generate_stream(question))
+
+    def test_replay_matches_recording(self):
+        """Test that replay serves both completions and streams without a key"""
+        recorded = self._record("Can AI feel?")
+        kelly = KellyScientist(enforce_structure=False,
+                               transport=ReplayTransport(self.cassette, time_scale=0))
+        replayed = kelly.generate("Can AI feel?"), "".join(kelly.generate_stream("Can AI feel?"))
+        self.assertEqual(recorded, replayed)
+        self.assertEqual(replayed[0], "Bold are the headlines.")
+        self.assertEqual(self.live.calls, 2)
+
+    def test_stream_chunks_are_preserved(self):
+        """Test that streamed chunk boundaries survive the cassette"""
+        self._record("Can AI feel?")
+        kelly = KellyScientist(transport=ReplayTransport(self.cassette, time_scale=0))
+        self.assertEqual(list(kelly.generate_stream("Can AI feel?")),
+                         ["Bold are ", "the headlines."])
+
+    def test_slow_consumer_time_is_not_recorded(self):
+        """Test that chunk delays measure the provider, not the caller"""
+        recorder = RecordingTransport(self.cassette, inner=self.live)
+        for _ in recorder.stream("https://example.test", {}, {"q": 1}):
+            time.sleep(0.1)
+        replay = ReplayTransport(self.cassette)
+        with open(self.cassette, encoding="utf-8") as f:
+            chunks = json.loads(f.readline())["chunks"]
+        self.assertTrue(all(delay < 0.05 for delay, _ in chunks), chunks)
+        self.assertEqual(list(replay.stream("https://example.test", {}, {"q": 1})),
+                         ["Bold are ", "the headlines."])
+
+    def test_provider_errors_are_replayed(self):
+        """Test that recorded HTTP errors are raised again on replay"""
+        recorder = RecordingTransport(self.cassette, inner=FailingTransport())
+        with self.assertRaises(FakeHTTPError):
+            recorder.complete("https://example.test", {}, {"q": 1})
+        with self.assertRaises(FakeHTTPError):
+            list(recorder.stream("https://example.test", {}, {"q": 2}))
+
+        replay = ReplayTransport(self.cassette, time_scale=0)
+        with self.assertRaises(RecordedError) as caught:
+            replay.complete("https://example.test", {}, {"q": 1})
+        self.assertEqual(caught.exception.status, 429)
+        chunks = []
+        with self.assertRaises(RecordedError) as caught:
+            for chunk in replay.stream("https://example.test", {}, {"q": 2}):
+                chunks.append(chunk)
+        self.assertEqual(chunks, ["Bold are "])
+        self.assertEqual(caught.exception.status, 503)
+
+    def test_unrecorded_request_raises(self):
+        """Test that a request missing from the cassette is reported"""
+        self._record("Can AI feel?")
+        kelly = KellyScientist(transport=ReplayTransport(self.cassette, time_scale=0))
+        with self.assertRaises(CassetteMiss):
+            kelly.generate("Will AI replace jobs?")
+
+    def test_api_key_not_recorded(self):
+        """Test that the cassette never contains the API key"""
+        self._record("Can AI feel?")
+        with open(self.cassette, encoding="utf-8") as f:
+            self.assertNotIn("gsk_test", f.read())
+
+    def test_transport_from_env(self):
+        """Test transport selection from the environment"""
+        os.environ["KELLY_TRANSPORT"] = "replay"
+        os.environ["KELLY_CASSETTE"] = self.cassette
+        try:
+            self.assertIsInstance(transport_from_env(), ReplayTransport)
+            self.assertIs(transport_from_env(), transport_from_env())
+            os.environ["KELLY_TRANSPORT"] = "bogus"
+            with self.assertRaises(ValueError):
+                transport_from_env()
+        finally:
+            del os.environ["KELLY_TRANSPORT"]
+            del os.environ["KELLY_CASSETTE"]
+            transport._env_transports.clear()
+
+    def test_env_replay_cycles_across_instances(self):
+        """Test that a new KellyScientist per request still cycles through recordings"""
+        self._record("Can AI feel?")
+        self.live.complete = lambda *args, **kwargs: {
+            "choices": [{"message": {"content": "Second take."}}]
+        }
+        self._record("Can AI feel?")
+        env = {"KELLY_TRANSPORT": "replay", "KELLY_CASSETTE": self.cassette, "KELLY_REPLAY_SPEED": "0"}
+        os.environ.update(env)
+        try:
+            answers = [KellyScientist(enforce_structure=False).generate("Can AI feel?") for _ in range(2)]
+        finally:
+            for key in env:
+                del os.environ[key]
+            transport._env_transports.clear()
+        self.assertEqual(answers, ["Bold are the headlines.", "Second take."])
+
+
+if __name__ == '__main__':
+    unittest.main()